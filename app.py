@@ -15,7 +15,10 @@ import mimetypes
 import uuid
 import hashlib
 import socket
+import sqlite3
+import html
 from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 app = Flask(__name__)
 
@@ -60,6 +63,46 @@ DEFAULT_SETTINGS = {
     "max_tokens": 2048
 }
 
+# 批量聊天限制
+BATCH_MAX_ITEMS = 1000
+BATCH_DEFAULT_CONCURRENCY = 4
+BATCH_MAX_CONCURRENCY = 16
+BATCH_READ_TIMEOUT = 60  # 单个流式分块的读取超时（秒）
+BATCH_MAX_RETRIES = 1
+
+# 全文搜索设置
+SEARCH_DEFAULT_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 100
+SEARCH_SNIPPET_CHARS = 120
+# 命中数不超过该值的关键词参与BM25相关度排序；所有关键词都更高频时改为按时间倒序返回
+SEARCH_RANK_LIMIT = 5000
+# 按时间倒序返回时总数最多统计到该值
+SEARCH_COUNT_LIMIT = 10000
+SEARCH_PREFIX_MIN_LEN = 3
+
+# 中日文字符逐字切分，使unicode61分词器可对任意长度的中文关键词做短语匹配
+CJK_CHAR_PATTERN = re.compile(r'([\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff])')
+# 与unicode61分词器一致：字母和数字组成词元，其余字符（含下划线）为分隔符
+SEARCH_TOKEN_PATTERN = re.compile(r'[^\W_]+')
+# 非中日文的字母或数字，用于高亮时判断拉丁词元边界
+SEARCH_LATIN_WORD_CLASS = r'[^\W_\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]'
+
+# 全文搜索索引（与会话一样保存在内存中）
+search_lock = threading.Lock()
+search_db = sqlite3.connect(':memory:', check_same_thread=False)
+try:
+    # session_key为会话ID的单词元摘要、kind为单词元类型，均可用列过滤器高效筛选
+    search_db.execute(
+        "CREATE VIRTUAL TABLE search_index USING fts5("
+        "terms, session_key, kind, content UNINDEXED, session_id UNINDEXED, role UNINDEXED, "
+        "file_id UNINDEXED, filename UNINDEXED, created_at UNINDEXED, tokenize='unicode61')"
+    )
+    # 相关度只按terms列计算
+    search_db.execute("INSERT INTO search_index (search_index, rank) VALUES ('rank', 'bm25(1.0, 0.0, 0.0)')")
+except sqlite3.OperationalError as e:
+    logging.warning(f"SQLite不支持FTS5，全文搜索不可用: {str(e)}")
+    search_db = None
+
 def find_free_port(start_port=5000, end_port=5050):
     """在指定范围内查找可用端口"""
     for port in range(start_port, end_port + 1):
@@ -111,6 +154,253 @@ def generate_file_context(files):
         context.append(f"文件{file_info['short_id']} ({file_info['filename']}):\n{content_preview}")
     return "\n\n".join(context)
 
+def build_chat_messages(conversation, user_input, system_prompt):
+    """根据会话历史、引用文件和当前输入构建发送给模型的消息列表"""
+    chat_messages = []
+    
+    # 添加系统提示（使用用户设置）
+    chat_messages.append({
+        "role": "system",
+        "content": system_prompt
+    })
+    
+    # 添加文件上下文
+    referenced_files = []
+    file_references = extract_file_references(user_input)
+    
+    if file_references:
+        for file_ref in file_references:
+            file_info = get_file_by_short_id(conversation, file_ref)
+            if file_info:
+                referenced_files.append(file_info)
+    
+    # 添加被引用的文件内容
+    if referenced_files:
+        file_context = generate_file_context(referenced_files)
+        chat_messages.append({
+            "role": "system",
+            "content": f"用户引用了以下文件内容:\n{file_context}"
+        })
+    
+    # 添加历史消息（排除系统消息）
+    for msg in conversation['messages']:
+        if msg['role'] != 'system':
+            # 处理文件消息
+            if msg.get('is_file', False):
+                chat_messages.append({
+                    "role": "user",
+                    "content": f"[文件消息] {msg['file_info']['display_id']}: {msg['file_info']['content_preview']}"
+                })
+            else:
+                chat_messages.append({
+                    "role": msg['role'],
+                    "content": msg['content']
+                })
+    
+    # 添加当前用户输入
+    chat_messages.append({
+        "role": "user",
+        "content": user_input
+    })
+    
+    return chat_messages
+
+def segment_search_text(text):
+    """在中日文字符之间插入空格，生成用于索引和查询的分词文本"""
+    return CJK_CHAR_PATTERN.sub(r' \1 ', text)
+
+def search_tokens(text):
+    """按与索引相同的规则切分词元"""
+    return SEARCH_TOKEN_PATTERN.findall(segment_search_text(text).lower())
+
+def search_session_key(session_id):
+    """将会话ID转换为单个词元，避免会话ID被拆成多个高频词元"""
+    return "s" + hashlib.md5(session_id.encode()).hexdigest()[:16]
+
+def write_search_index(sql, params, condition=None):
+    """执行搜索索引写操作，失败时只记录日志不影响主流程；condition在持锁后判断是否仍需写入"""
+    if search_db is None:
+        return
+    try:
+        with search_lock, search_db:
+            if condition is None or condition():
+                search_db.execute(sql, params)
+    except sqlite3.Error as e:
+        logging.error(f"更新搜索索引失败: {str(e)}")
+
+def index_message(session_id, role, content, timestamp, condition=None):
+    """将一条聊天消息加入搜索索引"""
+    write_search_index(
+        "INSERT INTO search_index (terms, session_key, kind, content, session_id, role, created_at) "
+        "VALUES (?, ?, 'message', ?, ?, ?, ?)",
+        (segment_search_text(content), search_session_key(session_id), content, session_id, role, timestamp),
+        condition
+    )
+
+def index_file(session_id, file_info):
+    """将解析后的文件内容（含文件名）加入搜索索引"""
+    write_search_index(
+        "INSERT INTO search_index (terms, session_key, kind, content, session_id, file_id, filename, created_at) "
+        "VALUES (?, ?, 'file', ?, ?, ?, ?, ?)",
+        (
+            segment_search_text(f"{file_info['filename']}\n{file_info['content']}"),
+            search_session_key(session_id),
+            file_info['content'],
+            session_id,
+            file_info['file_id'],
+            file_info['filename'],
+            file_info['upload_time']
+        )
+    )
+
+def unindex_file(session_id, file_id):
+    """从搜索索引中移除文件"""
+    write_search_index(
+        "DELETE FROM search_index WHERE search_index MATCH ? AND file_id = ?",
+        (f"{{session_key}} : {search_session_key(session_id)} AND {{kind}} : file", file_id)
+    )
+
+def unindex_conversation(session_id):
+    """从搜索索引中移除整个会话"""
+    write_search_index(
+        "DELETE FROM search_index WHERE search_index MATCH ?",
+        (f"{{session_key}} : {search_session_key(session_id)}",)
+    )
+
+def parse_search_terms(query):
+    """拆分搜索关键词（空白分隔，多个关键词为AND关系），忽略切分后不含任何词元的片段"""
+    return [term for term in query.split() if search_tokens(term)]
+
+def is_prefix_term(term):
+    """只有不含中日文字符且长度不小于SEARCH_PREFIX_MIN_LEN的关键词使用前缀匹配"""
+    return not CJK_CHAR_PATTERN.search(term) and len(term) >= SEARCH_PREFIX_MIN_LEN
+
+def search_phrase(term):
+    """将关键词转换为只匹配terms列的FTS5短语"""
+    phrase = '"' + " ".join(search_tokens(term)) + '"'
+    if is_prefix_term(term):
+        phrase += '*'
+    return "{terms} : " + phrase
+
+def count_matches(expr, limit):
+    """统计命中数，最多统计到limit+1条"""
+    return search_db.execute(
+        "SELECT count(*) FROM (SELECT 1 FROM search_index WHERE search_index MATCH ? LIMIT ?)",
+        (expr, limit + 1)
+    ).fetchone()[0]
+
+def run_search(terms, session_id=None, kind=None, page=1, page_size=SEARCH_DEFAULT_PAGE_SIZE):
+    """执行全文搜索，返回 (总数, 总数是否被截断, 排序方式, 当前页结果行)
+    
+    FTS5的bm25()需要遍历每个短语的全部命中来计算IDF，对几乎出现在所有文档中的关键词代价很高。
+    因此命中数不超过SEARCH_RANK_LIMIT的关键词用bm25()对其全部命中排序（排序方式为relevance），
+    更高频的关键词及会话、类型条件只作为过滤条件；若所有关键词都更高频，
+    则按时间倒序返回全部命中（排序方式为recent），不计算得分。两种方式下所有命中都可分页访问。
+    """
+    filters = []
+    if session_id:
+        filters.append(f"{{session_key}} : {search_session_key(session_id)}")
+    if kind:
+        filters.append(f"{{kind}} : {kind}")
+    
+    with search_lock:
+        rare, common = [], []
+        for term in terms:
+            phrase = search_phrase(term)
+            if count_matches(phrase, SEARCH_RANK_LIMIT) <= SEARCH_RANK_LIMIT:
+                rare.append(phrase)
+            else:
+                common.append(phrase)
+        
+        offset = (page - 1) * page_size
+        if rare:
+            order = 'relevance'
+            rank_expr = " AND ".join(rare)
+            full_expr = " AND ".join(rare + common + filters)
+            total = search_db.execute(
+                "SELECT count(*) FROM search_index WHERE search_index MATCH ?", (full_expr,)
+            ).fetchone()[0]
+            capped = False
+            if full_expr == rank_expr:
+                ranked = search_db.execute(
+                    "SELECT rowid, rank FROM search_index WHERE search_index MATCH ? ORDER BY rank LIMIT ? OFFSET ?",
+                    (rank_expr, page_size, offset)
+                ).fetchall()
+            else:
+                # 高频关键词和过滤条件只用于确定命中集合（子查询只做倒排表求交），不参与bm25()打分；
+                # +rowid阻止SQLite把IN下推为逐个rowid的FTS5查询（每次都会重新计算IDF）
+                ranked = search_db.execute(
+                    "SELECT rowid, rank FROM search_index WHERE search_index MATCH ? "
+                    "AND +rowid IN (SELECT rowid FROM search_index WHERE search_index MATCH ?) "
+                    "ORDER BY rank LIMIT ? OFFSET ?",
+                    (rank_expr, full_expr, page_size, offset)
+                ).fetchall()
+        else:
+            order = 'recent'
+            expr = " AND ".join(common + filters)
+            total = count_matches(expr, SEARCH_COUNT_LIMIT)
+            capped = total > SEARCH_COUNT_LIMIT
+            total = min(total, SEARCH_COUNT_LIMIT)
+            ranked = [
+                (rowid, None)
+                for rowid, in search_db.execute(
+                    "SELECT rowid FROM search_index WHERE search_index MATCH ? ORDER BY rowid DESC LIMIT ? OFFSET ?",
+                    (expr, page_size, offset)
+                )
+            ]
+        
+        rows = []
+        if ranked:
+            placeholders = ",".join("?" * len(ranked))
+            details = {
+                row[0]: row[1:]
+                for row in search_db.execute(
+                    "SELECT rowid, content, session_id, kind, role, file_id, filename, created_at "
+                    f"FROM search_index WHERE rowid IN ({placeholders})",
+                    [rowid for rowid, _ in ranked]
+                )
+            }
+            rows = [details[rowid] + (None if rank is None else -rank,) for rowid, rank in ranked]
+    
+    return total, capped, order, rows
+
+def search_term_pattern(term):
+    """生成与索引分词规则一致的高亮正则：拉丁词元前后须为词元边界且彼此间至少隔一个分隔符，
+    中日文字符各自成词无需边界，前缀关键词的末尾词元可继续延伸"""
+    word = SEARCH_LATIN_WORD_CLASS
+    tokens = search_tokens(term)
+    pattern = "" if CJK_CHAR_PATTERN.match(tokens[0]) else f"(?<!{word})"
+    for i, token in enumerate(tokens):
+        if i:
+            both_latin = not CJK_CHAR_PATTERN.match(tokens[i - 1]) and not CJK_CHAR_PATTERN.match(token)
+            pattern += r'[\W_]+' if both_latin else r'[\W_]*'
+        pattern += re.escape(token)
+    if is_prefix_term(term):
+        pattern += f"{word}*"
+    elif not CJK_CHAR_PATTERN.match(tokens[-1]):
+        pattern += f"(?!{word})"
+    return pattern
+
+def make_search_snippet(text, terms):
+    """截取首个命中关键词附近的文本，转义HTML后用<mark>高亮命中部分"""
+    # 在原文上匹配，再分别转义命中与非命中片段，避免高亮落在HTML实体内部
+    pattern = re.compile("|".join(f"(?:{search_term_pattern(term)})" for term in terms), re.IGNORECASE)
+    match = pattern.search(text)
+    center = match.start() if match else 0
+    
+    start = max(0, center - SEARCH_SNIPPET_CHARS // 2)
+    end = min(len(text), start + SEARCH_SNIPPET_CHARS)
+    window = text[start:end]
+    
+    snippet = ""
+    last = 0
+    for match in pattern.finditer(window):
+        snippet += html.escape(window[last:match.start()]) + f"<mark>{html.escape(match.group(0))}</mark>"
+        last = match.end()
+    snippet += html.escape(window[last:])
+    
+    return ('...' if start > 0 else '') + snippet + ('...' if end < len(text) else '')
+
 def parse_document(file_path, original_filename):
     """解析文档为Markdown文本"""
     # 使用原始文件名获取扩展名
@@ -340,6 +630,7 @@ def process_file(file, session_id, file_type):
         
         conversation['files'][file_id] = file_info
         conversation['lastActive'] = time.time()
+        index_file(session_id, file_info)
         
         # 添加到会话历史
         conversation['messages'].append({
@@ -401,6 +692,7 @@ def remove_file(file_id):
         
         # 从会话中移除文件
         del conversation['files'][file_id]
+        unindex_file(session_id, file_id)
         conversation['lastActive'] = time.time()
         
         # 打印移除后的文件列表
@@ -461,52 +753,7 @@ def chat():
     }
     
     # 准备聊天消息
-    chat_messages = []
-    
-    # 添加系统提示（使用用户设置）
-    chat_messages.append({
-        "role": "system",
-        "content": system_prompt
-    })
-    
-    # 添加文件上下文
-    referenced_files = []
-    file_references = extract_file_references(user_input)
-    
-    if file_references:
-        for file_ref in file_references:
-            file_info = get_file_by_short_id(conversation, file_ref)
-            if file_info:
-                referenced_files.append(file_info)
-    
-    # 添加被引用的文件内容
-    if referenced_files:
-        file_context = generate_file_context(referenced_files)
-        chat_messages.append({
-            "role": "system",
-            "content": f"用户引用了以下文件内容:\n{file_context}"
-        })
-    
-    # 添加历史消息（排除系统消息）
-    for msg in conversation['messages']:
-        if msg['role'] != 'system':
-            # 处理文件消息
-            if msg.get('is_file', False):
-                chat_messages.append({
-                    "role": "user",
-                    "content": f"[文件消息] {msg['file_info']['display_id']}: {msg['file_info']['content_preview']}"
-                })
-            else:
-                chat_messages.append({
-                    "role": msg['role'],
-                    "content": msg['content']
-                })
-    
-    # 添加当前用户输入
-    chat_messages.append({
-        "role": "user",
-        "content": user_input
-    })
+    chat_messages = build_chat_messages(conversation, user_input, system_prompt)
     
     # 更新会话标题
     if conversation['title'] == '新会话':
@@ -544,11 +791,20 @@ def chat():
                         yield f"data: {json.dumps({'char': char, 'model': model})}\n\n"
             
             # 整个流式响应完成后，将完整的助手回复添加到消息历史中
+            completed_at = time.time()
             conversation['messages'].append({
                 "role": "assistant", 
                 "content": assistant_response,
-                "is_file": False
+                "is_file": False,
+                "timestamp": completed_at
             })
+            
+            # 更新搜索索引（只索引会话历史中实际保存的消息）
+            # 流式输出期间会话可能已被删除，持锁后再确认，避免在unindex_conversation之后写入孤立结果
+            index_message(
+                session_id, "assistant", assistant_response, completed_at,
+                condition=lambda: conversations.get(session_id) is conversation
+            )
             # 发送结束事件
             yield "data: {\"done\": true}\n\n"
         
@@ -561,6 +817,195 @@ def chat():
             'detail': '可能原因：API 密钥错误、网络问题或服务器不可用。'
         }), 500
 
+def parse_batch_prompts(raw_body):
+    """解析JSONL格式的批量提示，每行为字符串或包含message字段的对象"""
+    items = []
+    for line_no, line in enumerate(raw_body.splitlines(), start=1):
+        line = line.strip()
+        if not line:
+            continue
+        
+        item = {"index": len(items), "line": line_no, "id": None, "message": "", "error": None}
+        try:
+            entry = json.loads(line)
+        except ValueError as e:
+            item["error"] = f"第{line_no}行不是有效的JSON: {str(e)}"
+            items.append(item)
+            continue
+        
+        if isinstance(entry, str):
+            item["message"] = entry.strip()
+        elif isinstance(entry, dict):
+            item["id"] = entry.get("id")
+            message = entry.get("message", "")
+            item["message"] = message.strip() if isinstance(message, str) else ""
+        else:
+            item["error"] = f"第{line_no}行格式不正确，应为字符串或对象"
+            items.append(item)
+            continue
+        
+        if not item["message"]:
+            item["error"] = "消息内容不能为空"
+        items.append(item)
+    
+    return items
+
+def run_batch_item(item, chat_messages, model, max_tokens):
+    """执行单条批量提示（内部流式读取后拼接完整回复），返回结果字典"""
+    result = {"index": item["index"], "id": item["id"], "message": item["message"]}
+    start_time = time.time()
+    try:
+        # 与chat()一样使用流式请求，超时只约束分块间隔，长回复不会整体超时
+        response = client.with_options(max_retries=BATCH_MAX_RETRIES).chat.completions.create(
+            model=model,
+            messages=chat_messages,
+            stream=True,
+            temperature=0.7,
+            max_tokens=max_tokens,
+            timeout=BATCH_READ_TIMEOUT,
+            # 流式响应默认不返回用量，需显式请求（用量在最后一个分块中返回）
+            stream_options={"include_usage": True}
+        )
+        content = ""
+        completion_tokens = None  # 服务未返回用量时保持为None，而不是报告为0
+        for chunk in response:
+            if chunk.choices and chunk.choices[0].delta.content:
+                content += chunk.choices[0].delta.content
+            usage = getattr(chunk, "usage", None)
+            if usage and getattr(usage, "completion_tokens", None) is not None:
+                completion_tokens = usage.completion_tokens
+        result["status"] = "success"
+        result["content"] = content
+        result["completion_chars"] = len(content)
+        result["completion_tokens"] = completion_tokens
+    except Exception as e:
+        logging.error(f"批量聊天第{item['index']}条失败: {str(e)}")
+        result["status"] = "error"
+        result["error"] = f"⚠️ 发生错误: {str(e)}"
+    result["elapsed"] = round(time.time() - start_time, 3)
+    return result
+
+@app.route('/chat/batch', methods=['POST'])
+def chat_batch():
+    """批量处理聊天请求（JSONL输入，NDJSON流式输出，每条完成即返回）"""
+    session_id = request.args.get('session_id')
+    
+    # 批量请求必须基于已有会话，避免拼错的session_id创建空会话导致文件引用全部失效
+    if not session_id:
+        return jsonify({'error': '缺少 session_id 参数'}), 400
+    if session_id not in conversations:
+        return jsonify({'error': f'会话不存在: {session_id}'}), 404
+    
+    items = parse_batch_prompts(request.get_data(as_text=True))
+    if not items:
+        return jsonify({'error': '批量请求内容不能为空'}), 400
+    if len(items) > BATCH_MAX_ITEMS:
+        return jsonify({'error': f'批量请求最多支持 {BATCH_MAX_ITEMS} 条'}), 400
+    
+    # 获取对话上下文，未指定的设置沿用会话设置
+    conversation = conversations[session_id]
+    conversation['lastActive'] = time.time()
+    settings = conversation.get('settings', DEFAULT_SETTINGS)
+    
+    model = request.args.get('model', settings["model"])
+    system_prompt = request.args.get('system_prompt', settings["system_prompt"])
+    max_tokens = request.args.get('max_tokens', settings["max_tokens"])
+    concurrency = request.args.get('concurrency', BATCH_DEFAULT_CONCURRENCY)
+    
+    # 验证模型是否有效
+    if model not in SUPPORTED_MODELS.values():
+        logging.error(f"无效的模型选择: {model}")
+        return jsonify({
+            'error': '无效的模型选择',
+            'supported_models': list(SUPPORTED_MODELS.values())
+        }), 400
+    
+    # 验证max_tokens和并发数范围
+    try:
+        max_tokens = max(256, min(int(max_tokens), 16384))
+        concurrency = max(1, min(int(concurrency), BATCH_MAX_CONCURRENCY))
+    except ValueError:
+        return jsonify({'error': 'max_tokens 和 concurrency 必须为整数'}), 400
+    
+    # 在主线程中构建所有上下文，避免工作线程读取变化中的会话历史
+    pending = [
+        (item, build_chat_messages(conversation, item["message"], system_prompt))
+        for item in items if not item["error"]
+    ]
+    
+    logging.info(f"批量聊天开始 (模型: {model}, 条数: {len(items)}, 并发: {concurrency})")
+    
+    def generate():
+        start_time = time.time()
+        succeeded = 0
+        failed = 0
+        completion_chars = 0
+        completion_tokens = 0
+        usage_reported = 0
+        
+        # 解析失败的条目直接返回错误（字段与模型调用失败的记录一致）
+        for item in items:
+            if item["error"]:
+                failed += 1
+                yield json.dumps({
+                    "index": item["index"],
+                    "id": item["id"],
+                    "message": item["message"],
+                    "status": "error",
+                    "error": item["error"],
+                    "elapsed": 0.0
+                }, ensure_ascii=False) + "\n"
+        
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+        try:
+            futures = [
+                executor.submit(run_batch_item, item, chat_messages, model, max_tokens)
+                for item, chat_messages in pending
+            ]
+            for future in as_completed(futures):
+                result = future.result()
+                if result["status"] == "success":
+                    succeeded += 1
+                    completion_chars += result["completion_chars"]
+                    if result["completion_tokens"] is not None:
+                        completion_tokens += result["completion_tokens"]
+                        usage_reported += 1
+                else:
+                    failed += 1
+                yield json.dumps(result, ensure_ascii=False) + "\n"
+        finally:
+            # 客户端断开时取消尚未开始的请求
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        elapsed = time.time() - start_time
+        
+        def rate(count):
+            return round(count / elapsed, 3) if count is not None and elapsed > 0 else None
+        
+        # 没有任何条目返回用量时token统计为None，避免被误读为实测速率为0
+        if not usage_reported:
+            completion_tokens = None
+        
+        stats = {
+            "total": len(items),
+            "attempted": len(pending),  # 实际发送给模型的条数（不含解析失败的行）
+            "succeeded": succeeded,
+            "failed": failed,
+            "concurrency": concurrency,
+            "elapsed": round(elapsed, 3),
+            "succeeded_per_second": rate(succeeded),
+            "attempted_per_second": rate(len(pending)),
+            "completion_chars": completion_chars,
+            "chars_per_second": rate(completion_chars),
+            "completion_tokens": completion_tokens,
+            "usage_reported": usage_reported,
+            "tokens_per_second": rate(completion_tokens)
+        }
+        logging.info(f"批量聊天完成: {stats}")
+        yield json.dumps({"done": True, "stats": stats}, ensure_ascii=False) + "\n"
+    
+    return Response(generate(), mimetype='application/x-ndjson')
+
 @app.route('/conversations', methods=['GET'])
 def get_conversations():
     """获取所有会话列表"""
@@ -579,6 +1024,64 @@ def get_conversations():
         ]
     })
 
+@app.route('/search', methods=['GET'])
+def search():
+    """全文搜索会话消息和已上传文件内容（按相关度或时间排序，分页返回摘要）"""
+    if search_db is None:
+        return jsonify({'status': 'error', 'message': '当前环境的SQLite不支持全文搜索'}), 503
+    
+    query = request.args.get('q', '').strip()
+    session_id = request.args.get('session_id')
+    kind = request.args.get('kind')
+    
+    terms = parse_search_terms(query)
+    if not terms:
+        return jsonify({'status': 'error', 'message': '搜索关键词不能为空'}), 400
+    if kind not in (None, 'message', 'file'):
+        return jsonify({'status': 'error', 'message': 'kind 只能为 message 或 file'}), 400
+    
+    try:
+        page = max(1, int(request.args.get('page', 1)))
+        page_size = max(1, min(int(request.args.get('page_size', SEARCH_DEFAULT_PAGE_SIZE)), SEARCH_MAX_PAGE_SIZE))
+    except ValueError:
+        return jsonify({'status': 'error', 'message': 'page 和 page_size 必须为整数'}), 400
+    
+    start_time = time.time()
+    try:
+        total, total_capped, order, rows = run_search(terms, session_id, kind, page, page_size)
+    except sqlite3.OperationalError as e:
+        logging.error(f"搜索失败: {str(e)}")
+        return jsonify({'status': 'error', 'message': f'搜索失败: {str(e)}'}), 400
+    
+    results = []
+    for content, row_session_id, row_kind, role, file_id, filename, created_at, score in rows:
+        conv = conversations.get(row_session_id)
+        results.append({
+            'session_id': row_session_id,
+            'title': conv['title'] if conv else None,
+            'kind': row_kind,
+            'role': role,
+            'file_id': file_id,
+            'filename': filename,
+            'timestamp': created_at,
+            'score': None if score is None else round(score, 4),
+            # 文件结果的文件名也在索引中，摘要同样从文件名开始匹配
+            'snippet': make_search_snippet(f"{filename}\n{content}" if row_kind == 'file' else content, terms)
+        })
+    
+    return jsonify({
+        'status': 'success',
+        'query': query,
+        'total': total,
+        'total_capped': total_capped,
+        'total_display': f"{total}+" if total_capped else str(total),
+        'order': order,
+        'page': page,
+        'page_size': page_size,
+        'took_ms': round((time.time() - start_time) * 1000, 2),
+        'results': results
+    })
+
 @app.route('/conversation/<session_id>', methods=['GET'])
 def get_conversation_details(session_id):
     """获取特定会话详情"""
@@ -623,6 +1126,7 @@ def delete_conversation(session_id):
     """删除会话"""
     if session_id in conversations:
         del conversations[session_id]
+        unindex_conversation(session_id)
         return jsonify({'status': 'success', 'message': '会话已删除'})
     return jsonify({'status': 'error', 'message': '会话不存在'}), 404
 
@@ -0,0 +1,146 @@
+"""全文搜索基准：先检查排序与匹配行为，再向索引写入10万条消息，测量高频/低频关键词的查询耗时
+
+用法: python bench_search.py [消息条数]
+"""
+import random
+import sys
+import time
+
+import app
+
+MESSAGE_COUNT = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+SESSION_COUNT = 500
+MESSAGE_CHARS = 600
+REPEAT = 20
+TARGET_MS = 50
+
+# 按词频从高到低排列，按Zipf分布抽样以模拟真实回复中的高频字词
+WORDS = (
+    "的 是 了 在 和 有 我 你 这 一个 我们 可以 文件 数据 分析 问题 需要 进行 使用 结果 模型 "
+    "系统 方法 内容 用户 总结 报告 结论 建议 处理 优化 网络 服务器 配置 部署 学习 计算 翻译 "
+    "a the is of and to in python flask server error timeout model data api request response "
+    "第二节 表格 图片 识别 季度 销售 增长 风险 客户 合同 条款 项目 进度 预算 测试"
+).split()
+WEIGHTS = [1 / (rank + 1) for rank in range(len(WORDS))]
+# 每隔RANKED_TERM_EVERY条消息加入一次，使其命中数正好处于相关度排序上限
+RANKED_TERM = "kubernetes"
+RANKED_TERM_EVERY = MESSAGE_COUNT // app.SEARCH_RANK_LIMIT or 1
+
+QUERIES = [
+    ("的", {}),
+    ("的 是", {}),
+    ("a", {}),
+    ("文件", {}),
+    ("数据 分析", {}),
+    ("pyth", {}),
+    ("合同 条款 风险", {}),
+    ("不存在的关键词组合", {}),
+    (RANKED_TERM, {}),
+    (f"{RANKED_TERM} 的", {}),
+    (RANKED_TERM, {"session_id": "session_7"}),
+    ("的", {"session_id": "session_7"}),
+    ("的", {"kind": "message"}),
+]
+
+
+def make_message(rng, i):
+    message = " ".join(rng.choices(WORDS, WEIGHTS, k=MESSAGE_CHARS // 3))[:MESSAGE_CHARS]
+    if i % RANKED_TERM_EVERY == 0:
+        message += f" {RANKED_TERM}"
+    return message
+
+
+def search(query, **options):
+    return app.run_search(app.parse_search_terms(query), **options)
+
+
+def check(condition, description):
+    print(f"{'✅' if condition else '❌'} {description}")
+    return condition
+
+
+def check_behaviour():
+    """在空索引上检查排序、分页和匹配行为，结束后清理写入的数据"""
+    now = time.time()
+    ok = True
+
+    # 较早但高度相关的消息不能因为之后有大量弱相关消息而无法找到
+    app.index_message("check_old", "assistant", "kubernetes kubernetes kubernetes kubernetes 集群部署", now)
+    for i in range(1200):
+        app.index_message("check_new", "assistant", f"第{i}条消息顺带提到 kubernetes 以及其他很多无关的内容", now + i + 1)
+    total, capped, order, rows = search("kubernetes", page_size=5)
+    ok &= check(order == "relevance" and total == 1201 and not capped, f"kubernetes 全部命中参与相关度排序 ({order}, {total})")
+    ok &= check(bool(rows) and rows[0][1] == "check_old", "较早的高相关消息排在第一位")
+    _, _, _, last_page = search("kubernetes", page=61, page_size=20)
+    ok &= check(len(last_page) == 1, "最后一页仍可访问")
+
+    # 只含分隔符的关键词不应让AND查询整体失效
+    ok &= check(search("kubernetes _")[0] == 1201, "忽略不产生词元的关键词 (_)")
+
+    # 仅文件名命中也应有得分和高亮；标点差异不影响匹配
+    app.index_file("check_file", {
+        "filename": "report.pdf", "content": "A & B <tag> 季度 foo bar 数据",
+        "file_id": "f1", "upload_time": now
+    })
+    _, _, _, rows = search("report", kind="file")
+    ok &= check(bool(rows) and rows[0][-1] > 0, "文件名命中有得分")
+    ok &= check("<mark>report</mark>" in app.make_search_snippet(f"{rows[0][5]}\n{rows[0][0]}", ["report"]) if rows else False,
+                "文件名命中出现在摘要高亮中")
+    _, _, _, rows = search("foo-bar")
+    ok &= check(bool(rows) and rows[0][-1] > 0, "foo-bar 与 foo bar 按相同词元匹配")
+    snippet = app.make_search_snippet("A & B <tag> amp lt", ["amp", "lt"])
+    ok &= check("&amp;" in snippet and "&<mark>" not in snippet, "高亮不落在HTML实体内部")
+    ok &= check(app.make_search_snippet("这是的文件", ["文件"]).count("<mark>文件</mark>") == 1, "中文关键词在连续文本中高亮")
+
+    for session_id in ("check_old", "check_new", "check_file"):
+        app.unindex_conversation(session_id)
+    ok &= check(search("kubernetes")[0] == 0, "删除会话后索引已清理")
+    return ok
+
+
+def build_index():
+    rng = random.Random(0)
+    start = time.time()
+    for i in range(MESSAGE_COUNT):
+        app.index_message(f"session_{i % SESSION_COUNT}", "assistant", make_message(rng, i), start + i)
+    return time.time() - start
+
+
+def time_query(query, options):
+    terms = app.parse_search_terms(query)
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        total, capped, order, rows = app.run_search(terms, **options)
+        for row in rows:
+            app.make_search_snippet(row[0], terms)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return total, capped, order, timings[len(timings) // 2], timings[int(len(timings) * 0.95) - 1]
+
+
+def main():
+    if not check_behaviour():
+        print("❌ 搜索行为检查未通过")
+        sys.exit(1)
+
+    print(f"写入 {MESSAGE_COUNT} 条消息（每条约 {MESSAGE_CHARS} 字符）...")
+    print(f"索引耗时: {build_index():.1f}s")
+    print(f"{'查询':<36}{'命中':>8}{'排序':>11}{'p50(ms)':>10}{'p95(ms)':>10}")
+
+    failed = False
+    for query, options in QUERIES:
+        total, capped, order, p50, p95 = time_query(query, options)
+        label = query + (f" {options}" if options else "")
+        hits = f"{total}+" if capped else str(total)
+        print(f"{label:<36}{hits:>8}{order:>11}{p50:>10.1f}{p95:>10.1f}")
+        failed = failed or p95 >= TARGET_MS
+
+    if failed:
+        print(f"❌ 存在 p95 超过 {TARGET_MS}ms 的查询")
+        sys.exit(1)
+    print(f"✅ 所有查询 p95 均低于 {TARGET_MS}ms")
+
+
+if __name__ == '__main__':
+    main()